@@ -8,13 +8,17 @@ Deploy as separate Render Background Worker
 
 import os
 import requests
+import numpy as np
 import psycopg
-import json
+from psycopg import sql
+from psycopg.types.json import Json
+from psycopg_pool import ConnectionPool
 import time
 import asyncio
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from decimal import Decimal
-from collections import defaultdict
+from collections import defaultdict, deque
+from typing import Final
 import statistics
 
 print("⚡ FCB ACTIVITY MONITOR STARTING - PUMP/DUMP DETECTION...", flush=True)
@@ -27,312 +31,656 @@ DATABASE_URL = os.getenv('DB_URL', "postgresql://wallet_admin:AbRD14errRCD6H793F
 ETHERSCAN_API_KEY = os.getenv('ETHERSCAN_API_KEY', 'GCB4J11T34YG29GNJJX7R7JADRTAFJKPDE')
 COINGECKO_PRO_API_KEY = os.getenv('COINGECKO_API_KEY', 'CG-bJP1bqyMemFNQv5dp4nvA9xm')
 
+# CoinGecko price API
+COINGECKO_API_URL = "https://pro-api.coingecko.com/api/v3"
+COINGECKO_RATE_LIMIT_PER_MINUTE = 25  # Stay under the plan's per-minute request cap
+COINGECKO_MAX_RETRIES = 3  # Retries on 429 with exponential backoff
+COINGECKO_IDS = {
+    'UNI': 'uniswap', 'LINK': 'chainlink', 'AAVE': 'aave', 'COMP': 'compound-governance-token',
+    'CRV': 'curve-dao-token', 'SUSHI': 'sushi', 'PEPE': 'pepe', 'SHIB': 'shiba-inu',
+    'FLOKI': 'floki', 'USDC': 'usd-coin', 'USDT': 'tether', 'DAI': 'dai',
+    'APE': 'apecoin', 'SAND': 'the-sandbox', 'MANA': 'decentraland', 'MATIC': 'matic-network', 'ARB': 'arbitrum'
+}
+
+# Fallback prices when CoinGecko is unavailable or the token is unmapped
+FALLBACK_TOKEN_PRICES = {
+    'UNI': 12.45, 'LINK': 18.20, 'AAVE': 95.30, 'COMP': 75.15,
+    'CRV': 0.85, 'SUSHI': 2.15, 'PEPE': 0.00002, 'SHIB': 0.000025,
+    'FLOKI': 0.00015, 'USDC': 1.00, 'USDT': 1.00, 'DAI': 1.00,
+    'APE': 3.20, 'SAND': 0.45, 'MANA': 0.65, 'MATIC': 0.85, 'ARB': 1.25
+}
+
 # Activity Monitor Configuration
-SCAN_INTERVAL = 60  # Scan every 60 seconds
+SCAN_INTERVAL = 60  # Fallback scan every 60 seconds when no whale events arrive
+WHALE_EVENT_CHANNEL = 'whale_event'  # NOTIFY channel fired on whale inserts
+EVENT_DEBOUNCE_SECONDS = 5  # Coalesce bursts of whale events into one scan
+MIN_SCAN_SPACING_SECONDS = 20  # Sustained whale events never scan more often than this
 COORDINATION_THRESHOLD = 3  # 3+ whales acting together = potential coordination
 TIME_WINDOW_MINUTES = 15  # Look for activity within 15-minute windows
 VOLUME_CORRELATION_THRESHOLD = 0.8  # 80%+ volume correlation = suspicious
+CORRELATION_WINDOW_NS = 300 * 1_000_000_000  # Wallet activities within 5 minutes count as correlated
 WHALE_THRESHOLD = 1000  # $1000+ to be considered whale activity
+HISTORY_MAXLEN = TIME_WINDOW_MINUTES * 60 // MIN_SCAN_SPACING_SECONDS  # Covers the window at the fastest scan rate
+ALERT_DEDUPE_SECONDS = (TIME_WINDOW_MINUTES + 1) * 60  # A saved bucket (plus its partial minute) has left the window by then
+CORRELATION_PAIR_BLOCK = 65536  # In-window event pairs materialized at once by the correlation sweep
+ACTIVITY_FETCH_BATCH = 2000  # Rows per round trip when streaming recent activity
 
 # Pump/Dump Detection Parameters
-PUMP_INDICATORS = {
-    'rapid_buys': 5,  # 5+ whales buying same token in 15 minutes
-    'volume_spike': 3.0,  # 3x normal volume
-    'price_increase': 0.15  # 15%+ price increase
-}
+PUMP_RAPID_BUYS: Final = 5  # 5+ whales buying same token in 15 minutes
+PUMP_VOLUME_SPIKE: Final = 3.0  # 3x normal volume
+PUMP_PRICE_INCREASE: Final = 0.15  # 15%+ price increase
 
-DUMP_INDICATORS = {
-    'rapid_sells': 4,  # 4+ whales selling same token in 15 minutes
-    'volume_spike': 2.5,  # 2.5x normal volume  
-    'price_decrease': 0.10  # 10%+ price decrease
-}
+DUMP_RAPID_SELLS: Final = 4  # 4+ whales selling same token in 15 minutes
+DUMP_VOLUME_SPIKE: Final = 2.5  # 2.5x normal volume
+DUMP_PRICE_DECREASE: Final = 0.10  # 10%+ price decrease
+
+INSERT_ALERT_SQL = """
+    INSERT INTO pump_dump_alerts 
+    (alert_type, token_symbol, whale_count, total_volume, confidence_score, alert_data)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
 
 class ActivityMonitor:
     def __init__(self):
         self.scan_count = 0
         self.total_alerts = 0
-        self.whale_activity_history = defaultdict(list)
-        self.token_price_history = defaultdict(list)
+        self.whale_activity_history = defaultdict(lambda: deque(maxlen=HISTORY_MAXLEN))
+        self.token_price_history = defaultdict(lambda: deque(maxlen=HISTORY_MAXLEN))
+        
+        # Price cache: token -> (price, monotonic expiry), refreshed at most once per scan
+        self._price_cache = {}
+        
+        # Token-bucket rate limiter for CoinGecko requests
+        self._price_request_tokens = float(COINGECKO_RATE_LIMIT_PER_MINUTE)
+        self._price_request_refill_at = time.monotonic()
+        self._last_scan_tokens = set()
+        
+        # (type, token, bucket) keys already saved -> monotonic save time, so event-driven
+        # rescans don't re-insert alerts
+        self._alerted_buckets = {}
+        
+        # Reuse connections across scans instead of paying the TLS/auth handshake every query
+        self.pool = ConnectionPool(DATABASE_URL, min_size=2, max_size=10, kwargs={"autocommit": False}, open=True)
+        self._ensure_schema()
         
     def get_database_connection(self):
-        """Get database connection"""
+        """Get pooled database connection (commits/rolls back and returns to pool on exit)"""
+        return self.pool.connection()
+    
+    def _ensure_schema(self):
+        """Create alerts table and scan indexes once at startup instead of on every insert"""
+        # Each step is independent so a failure on a table we don't own never loses the alerts table
+        self._ensure_alerts_table()
+        self._ensure_scan_index()
+        self.whale_events_enabled = self._ensure_whale_event_trigger()
+    
+    def _ensure_alerts_table(self):
+        """Create the pump/dump alerts table if it doesn't exist"""
         try:
-            return psycopg.connect(DATABASE_URL)
+            with self.get_database_connection() as conn, conn.cursor() as cursor:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS pump_dump_alerts (
+                        id SERIAL PRIMARY KEY,
+                        alert_type VARCHAR(50) NOT NULL,
+                        token_symbol VARCHAR(20) NOT NULL,
+                        whale_count INTEGER NOT NULL,
+                        total_volume DECIMAL(20,2) NOT NULL,
+                        confidence_score DECIMAL(3,2) NOT NULL,
+                        alert_timestamp TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+                        alert_data JSONB,
+                        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+                    )
+                """)
         except Exception as e:
-            print(f"❌ Database connection failed: {e}", flush=True)
-            return None
+            print(f"⚠️ Failed to create alerts table: {e}", flush=True)
     
-    def get_database_whales(self):
-        """Get all whale addresses from database"""
-        conn = self.get_database_connection()
-        if not conn:
-            return []
-        
+    def _ensure_scan_index(self):
+        """Build the scan index on whale_transactions without blocking the ingest service's inserts"""
         try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT DISTINCT wallet_address, coin_symbol, 
-                       COUNT(*) as transaction_count,
-                       SUM(amount_usd) as total_volume,
-                       MAX(block_timestamp) as last_activity
-                FROM whale_transactions 
-                WHERE block_timestamp > NOW() - INTERVAL '7 days'
-                GROUP BY wallet_address, coin_symbol
-                HAVING SUM(amount_usd) > %s
-                ORDER BY total_volume DESC
-            """, (WHALE_THRESHOLD,))
+            # CONCURRENTLY can't run inside a transaction, so use a one-off autocommit connection
+            with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+                # A concurrent build killed mid-way (deploy/restart) leaves an INVALID index that
+                # IF NOT EXISTS would skip forever while inserts keep maintaining it
+                row = conn.execute("""
+                    SELECT indisvalid FROM pg_index
+                    WHERE indexrelid = to_regclass('idx_wt_ts_amount')
+                """).fetchone()
+                if row and row[0]:
+                    return
+                if row:
+                    print("🔧 Rebuilding invalid idx_wt_ts_amount", flush=True)
+                    conn.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_wt_ts_amount")
+                
+                # Range seek on the hot block_timestamp/amount_usd filter, index-only for the grouped columns
+                conn.execute("""
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wt_ts_amount
+                    ON whale_transactions (block_timestamp DESC, amount_usd)
+                    INCLUDE (wallet_address, coin_symbol, activity_type)
+                """)
+        except Exception as e:
+            print(f"⚠️ Failed to create whale_transactions scan index: {e}", flush=True)
+    
+    def _ensure_whale_event_trigger(self):
+        """Install the whale_event NOTIFY trigger if missing; returns whether events are available"""
+        try:
+            with self.get_database_connection() as conn, conn.cursor() as cursor:
+                # Only touch the live table when the trigger is missing (no lock on every restart)
+                cursor.execute("""
+                    SELECT 1 FROM pg_trigger
+                    WHERE tgname = 'whale_event_notify'
+                    AND tgrelid = 'whale_transactions'::regclass
+                """)
+                if cursor.fetchone():
+                    return True
+                
+                # Notify listeners of new whale activity so scans are event-driven
+                cursor.execute(sql.SQL("""
+                    CREATE OR REPLACE FUNCTION notify_whale_event() RETURNS trigger AS $$
+                    BEGIN
+                        PERFORM pg_notify({channel}, NEW.coin_symbol);
+                        RETURN NULL;
+                    END;
+                    $$ LANGUAGE plpgsql
+                """).format(channel=sql.Literal(WHALE_EVENT_CHANNEL)))
+                cursor.execute(sql.SQL("""
+                    CREATE TRIGGER whale_event_notify
+                    AFTER INSERT ON whale_transactions
+                    FOR EACH ROW WHEN (NEW.amount_usd > {threshold})
+                    EXECUTE FUNCTION notify_whale_event()
+                """).format(threshold=sql.Literal(WHALE_THRESHOLD)))
+                return True
             
-            whales = cursor.fetchall()
-            return whales
+        except Exception as e:
+            print(f"⚠️ Failed to install whale event trigger, polling every {SCAN_INTERVAL}s: {e}", flush=True)
+            return False
+    
+    def get_database_whale_count(self):
+        """Count distinct whale wallets active in the last 7 days"""
+        try:
+            with self.get_database_connection() as conn, conn.cursor() as cursor:
+                # Served from idx_wt_ts_amount; no per-wallet aggregation or sort needed for a count
+                cursor.execute("""
+                    SELECT COUNT(DISTINCT wallet_address)
+                    FROM whale_transactions 
+                    WHERE block_timestamp > NOW() - INTERVAL '7 days'
+                    AND amount_usd > %s
+                """, (WHALE_THRESHOLD,))
+                
+                return cursor.fetchone()[0]
             
         except Exception as e:
-            print(f"⚠️ Failed to get database whales: {e}", flush=True)
-            return []
-        finally:
-            conn.close()
+            print(f"⚠️ Failed to count database whales: {e}", flush=True)
+            return 0
+    
+    def new_activity_batch(self):
+        """Empty per-scan activity state: token summaries plus SoA columns for correlation"""
+        return {
+            'count': 0,
+            'token_summary': defaultdict(lambda: {'buys': 0, 'sells': 0, 'volume': 0.0, 'whales': set()}),
+            'wallet_ids': {},
+            'token_ids': {},
+            'wallets': [],
+            'tokens': [],
+            'times': []
+        }
     
     def get_recent_whale_activity(self, time_window_minutes=15):
-        """Get whale activity in the last X minutes"""
-        conn = self.get_database_connection()
-        if not conn:
-            return []
+        """Stream whale activity in the last X minutes into a single-pass activity batch"""
+        batch = self.new_activity_batch()
+        token_summary = batch['token_summary']
+        wallet_ids, token_ids = batch['wallet_ids'], batch['token_ids']
+        wallets, tokens, times = batch['wallets'], batch['tokens'], batch['times']
         
         try:
-            cursor = conn.cursor()
-            cutoff_time = datetime.now(timezone.utc) - timedelta(minutes=time_window_minutes)
-            
-            cursor.execute("""
-                SELECT wallet_address, coin_symbol, activity_type,
-                       amount_tokens, amount_usd, block_timestamp,
-                       transaction_id
-                FROM whale_transactions 
-                WHERE block_timestamp > %s
-                AND amount_usd > %s
-                ORDER BY block_timestamp DESC
-            """, (cutoff_time, WHALE_THRESHOLD))
-            
-            activities = cursor.fetchall()
-            return activities
+            # Server-side cursor: rows arrive in itersize chunks and are folded as they stream
+            with self.get_database_connection() as conn, conn.cursor(name='recent_activity') as cursor:
+                cursor.itersize = ACTIVITY_FETCH_BATCH
+                cursor.execute("""
+                    SELECT wallet_address, coin_symbol, activity_type,
+                           amount_usd::double precision AS amount_usd,
+                           (extract(epoch FROM block_timestamp) * 1000000000)::bigint AS block_ts_ns
+                    FROM whale_transactions 
+                    WHERE block_timestamp > NOW() - make_interval(mins => %s::int)
+                    AND amount_usd > %s
+                    ORDER BY block_timestamp DESC
+                """, (time_window_minutes, WHALE_THRESHOLD))
+                
+                for wallet, token, activity_type, usd, ts_ns in cursor:
+                    summary = token_summary[token]
+                    summary['whales'].add(wallet)
+                    summary['volume'] += usd
+                    
+                    if activity_type in ['buy', 'transfer']:
+                        summary['buys'] += 1
+                    elif activity_type == 'sell':
+                        summary['sells'] += 1
+                    
+                    # Intern wallets (first-seen order) and tokens for the correlation kernel
+                    wallets.append(wallet_ids.setdefault(wallet, len(wallet_ids)))
+                    tokens.append(token_ids.setdefault(token, len(token_ids)))
+                    times.append(ts_ns)
+                
+                batch['count'] = len(times)
+                return batch
             
         except Exception as e:
             print(f"⚠️ Failed to get recent activity: {e}", flush=True)
+            return self.new_activity_batch()
+    
+    def get_coordination_buckets(self, time_window_minutes=15):
+        """Get per-(token, minute, side) aggregates for buckets that meet the pump/dump thresholds"""
+        try:
+            with self.get_database_connection() as conn, conn.cursor() as cursor:
+                # Postgres does the bucketing and distinct-wallet counting; buys include transfers,
+                # and bucket_count is the total across all activity types in the minute. Only
+                # buckets that pass the thresholds get their per-transaction activity JSON built.
+                cursor.execute("""
+                    WITH buckets AS (
+                        SELECT coin_symbol,
+                               date_trunc('minute', block_timestamp) AS bucket,
+                               CASE WHEN activity_type IN ('buy', 'transfer') THEN 'buy'
+                                    WHEN activity_type = 'sell' THEN 'sell'
+                               END AS side,
+                               COUNT(*) AS activity_count,
+                               SUM(amount_usd)::double precision AS total_usd,
+                               COUNT(DISTINCT wallet_address) AS unique_wallets,
+                               SUM(COUNT(*)) OVER (
+                                   PARTITION BY coin_symbol, date_trunc('minute', block_timestamp)
+                               )::bigint AS bucket_count
+                        FROM whale_transactions 
+                        WHERE block_timestamp > NOW() - make_interval(mins => %(window)s::int)
+                        AND amount_usd > %(threshold)s
+                        GROUP BY 1, 2, 3
+                    )
+                    SELECT b.coin_symbol, b.bucket, b.side,
+                           b.activity_count, b.total_usd, b.unique_wallets,
+                           (
+                               SELECT json_agg(json_build_object(
+                                   'wallet', t.wallet_address,
+                                   'type', t.activity_type,
+                                   'usd_amount', t.amount_usd,
+                                   'timestamp', t.block_timestamp,
+                                   'tx_id', t.transaction_id
+                               ))
+                               FROM whale_transactions t
+                               WHERE t.coin_symbol = b.coin_symbol
+                               AND t.block_timestamp >= b.bucket
+                               AND t.block_timestamp < b.bucket + INTERVAL '1 minute'
+                               AND t.block_timestamp > NOW() - make_interval(mins => %(window)s::int)
+                               AND t.amount_usd > %(threshold)s
+                               AND CASE WHEN t.activity_type IN ('buy', 'transfer') THEN 'buy'
+                                        WHEN t.activity_type = 'sell' THEN 'sell'
+                                   END = b.side
+                           ) AS activities,
+                           b.bucket_count
+                    FROM buckets b
+                    WHERE b.bucket_count >= %(coordination)s
+                    AND (
+                        (b.side = 'buy' AND b.activity_count >= %(rapid_buys)s)
+                        OR (b.side = 'sell' AND b.activity_count >= %(rapid_sells)s)
+                    )
+                """, {
+                    'window': time_window_minutes,
+                    'threshold': WHALE_THRESHOLD,
+                    'coordination': COORDINATION_THRESHOLD,
+                    'rapid_buys': PUMP_RAPID_BUYS,
+                    'rapid_sells': DUMP_RAPID_SELLS
+                })
+                
+                return cursor.fetchall()
+            
+        except Exception as e:
+            print(f"⚠️ Failed to get coordination buckets: {e}", flush=True)
             return []
-        finally:
-            conn.close()
     
-    def get_token_price(self, token_symbol):
-        """Get current token price from database or API"""
-        # For now, return mock price - in production, integrate with price API
-        mock_prices = {
-            'UNI': 12.45, 'LINK': 18.20, 'AAVE': 95.30, 'COMP': 75.15,
-            'CRV': 0.85, 'SUSHI': 2.15, 'PEPE': 0.00002, 'SHIB': 0.000025,
-            'FLOKI': 0.00015, 'USDC': 1.00, 'USDT': 1.00, 'DAI': 1.00,
-            'APE': 3.20, 'SAND': 0.45, 'MANA': 0.65, 'MATIC': 0.85, 'ARB': 1.25
-        }
-        return mock_prices.get(token_symbol, 1.0)
+    def _acquire_price_request_slot(self):
+        """Block until the CoinGecko token bucket allows another request"""
+        refill_rate = COINGECKO_RATE_LIMIT_PER_MINUTE / 60.0
+        
+        while True:
+            now = time.monotonic()
+            self._price_request_tokens = min(
+                COINGECKO_RATE_LIMIT_PER_MINUTE,
+                self._price_request_tokens + (now - self._price_request_refill_at) * refill_rate
+            )
+            self._price_request_refill_at = now
+            
+            if self._price_request_tokens >= 1:
+                self._price_request_tokens -= 1
+                return
+            
+            time.sleep((1 - self._price_request_tokens) / refill_rate)
     
-    def detect_coordination_patterns(self, activities):
-        """Detect coordination patterns among whale activities"""
-        if not activities:
-            return []
+    def fetch_coingecko_prices(self, token_symbols):
+        """Fetch USD prices for many tokens in a single CoinGecko request"""
+        ids = {COINGECKO_IDS[symbol]: symbol for symbol in token_symbols if symbol in COINGECKO_IDS}
+        if not ids:
+            return {}
         
-        # Group activities by token and time
-        token_activities = defaultdict(lambda: defaultdict(list))
+        for attempt in range(COINGECKO_MAX_RETRIES + 1):
+            self._acquire_price_request_slot()
+            
+            try:
+                response = requests.get(
+                    f"{COINGECKO_API_URL}/simple/price",
+                    params={'ids': ','.join(ids), 'vs_currencies': 'usd'},
+                    headers={'x-cg-pro-api-key': COINGECKO_PRO_API_KEY},
+                    timeout=10
+                )
+                
+                if response.status_code == 429 and attempt < COINGECKO_MAX_RETRIES:
+                    backoff = 2 ** attempt
+                    print(f"⏳ CoinGecko rate limited, retrying in {backoff}s", flush=True)
+                    time.sleep(backoff)
+                    continue
+                
+                response.raise_for_status()
+                data = response.json()
+                return {
+                    symbol: float(data[coin_id]['usd'])
+                    for coin_id, symbol in ids.items()
+                    if 'usd' in data.get(coin_id, {})
+                }
+                
+            except Exception as e:
+                print(f"⚠️ Failed to fetch token prices: {e}", flush=True)
+                return {}
+        
+        return {}
+    
+    def get_token_prices(self, token_symbols):
+        """Get current token prices, batching cache misses into one API call (None when unpriced)"""
+        now = time.monotonic()
+        prices = {}
+        missing = []
+        
+        for symbol in token_symbols:
+            cached = self._price_cache.get(symbol)
+            if cached and cached[1] > now:
+                prices[symbol] = cached[0]
+            else:
+                missing.append(symbol)
         
-        for activity in activities:
-            wallet, token, activity_type, tokens, usd, timestamp, tx_id = activity
-            time_bucket = timestamp.replace(second=0, microsecond=0)  # Group by minute
+        if missing:
+            fetched = self.fetch_coingecko_prices(missing)
+            expiry = time.monotonic() + SCAN_INTERVAL
             
-            token_activities[token][time_bucket].append({
-                'wallet': wallet,
-                'type': activity_type,
-                'usd_amount': float(usd),
-                'timestamp': timestamp,
-                'tx_id': tx_id
-            })
+            # Misses are cached too, so an outage costs one request (with its retries) per TTL
+            # rather than one per lookup
+            for symbol in missing:
+                if symbol in fetched:
+                    price = fetched[symbol]
+                elif symbol in self._price_cache:
+                    price = self._price_cache[symbol][0]  # Stale beats nothing
+                else:
+                    price = FALLBACK_TOKEN_PRICES.get(symbol)
+                self._price_cache[symbol] = (price, expiry)
+                prices[symbol] = price
+        
+        return prices
+    
+    def detect_coordination_patterns(self, bucket_rows):
+        """Detect coordination patterns from per-minute activity aggregates"""
+        if not bucket_rows:
+            return []
+        
+        # Fold pre-aggregated side rows into per-bucket stats in a single pass
+        token_stats = defaultdict(lambda: defaultdict(lambda: {
+            'bucket_count': 0,
+            'buy_count': 0, 'sell_count': 0,
+            'buy_usd': 0.0, 'sell_usd': 0.0,
+            'buy_whales': 0, 'sell_whales': 0,
+            'buy_activities': [], 'sell_activities': []
+        }))
+        
+        for row in bucket_rows:
+            token, time_bucket, side, count, usd, unique_wallets, activities, bucket_count = row
+            stats = token_stats[token][time_bucket]
+            stats['bucket_count'] = bucket_count
+            stats[f'{side}_count'] = count
+            stats[f'{side}_usd'] = usd
+            stats[f'{side}_whales'] = unique_wallets
+            stats[f'{side}_activities'] = activities
         
         coordination_alerts = []
         
         # Analyze each token for coordination patterns
-        for token, time_buckets in token_activities.items():
-            for time_bucket, activities_in_bucket in time_buckets.items():
-                if len(activities_in_bucket) >= COORDINATION_THRESHOLD:
-                    
-                    # Analyze activity types
-                    buy_activities = [a for a in activities_in_bucket if a['type'] in ['buy', 'transfer']]
-                    sell_activities = [a for a in activities_in_bucket if a['type'] == 'sell']
+        for token, time_buckets in token_stats.items():
+            for time_bucket, stats in time_buckets.items():
+                if stats['bucket_count'] >= COORDINATION_THRESHOLD:
                     
                     # Check for pump pattern (coordinated buying)
-                    if len(buy_activities) >= PUMP_INDICATORS['rapid_buys']:
-                        total_volume = sum(a['usd_amount'] for a in buy_activities)
-                        unique_wallets = len(set(a['wallet'] for a in buy_activities))
+                    if stats['buy_count'] >= PUMP_RAPID_BUYS:
+                        unique_wallets = stats['buy_whales']
                         
                         coordination_alerts.append({
                             'type': 'POTENTIAL_PUMP',
                             'token': token,
-                            'time': time_bucket,
+                            'time': time_bucket.isoformat(),
+                            'bucket': time_bucket,
                             'whale_count': unique_wallets,
-                            'total_volume': total_volume,
-                            'activities': buy_activities,
-                            'confidence': min(unique_wallets / PUMP_INDICATORS['rapid_buys'], 1.0)
+                            'total_volume': stats['buy_usd'],
+                            'activities': stats['buy_activities'],
+                            'confidence': min(unique_wallets / PUMP_RAPID_BUYS, 1.0)
                         })
                     
                     # Check for dump pattern (coordinated selling)
-                    if len(sell_activities) >= DUMP_INDICATORS['rapid_sells']:
-                        total_volume = sum(a['usd_amount'] for a in sell_activities)
-                        unique_wallets = len(set(a['wallet'] for a in sell_activities))
+                    if stats['sell_count'] >= DUMP_RAPID_SELLS:
+                        unique_wallets = stats['sell_whales']
                         
                         coordination_alerts.append({
                             'type': 'POTENTIAL_DUMP',
                             'token': token,
-                            'time': time_bucket,
+                            'time': time_bucket.isoformat(),
+                            'bucket': time_bucket,
                             'whale_count': unique_wallets,
-                            'total_volume': total_volume,
-                            'activities': sell_activities,
-                            'confidence': min(unique_wallets / DUMP_INDICATORS['rapid_sells'], 1.0)
+                            'total_volume': stats['sell_usd'],
+                            'activities': stats['sell_activities'],
+                            'confidence': min(unique_wallets / DUMP_RAPID_SELLS, 1.0)
                         })
         
         return coordination_alerts
     
-    def analyze_wallet_correlations(self, activities):
+    def analyze_wallet_correlations(self, activity):
         """Analyze wallet behavior correlations"""
-        if len(activities) < 2:
+        if activity['count'] < 2:
+            return []
+        
+        # Activities were packed into SoA columns while streaming; timestamps are
+        # int64 epoch-nanoseconds so no datetime math happens here
+        wallet_ids = activity['wallet_ids']
+        token_ids = activity['token_ids']
+        wallet_idx = np.array(activity['wallets'], dtype=np.int32)
+        token_idx = np.array(activity['tokens'], dtype=np.int32)
+        ts = np.array(activity['times'], dtype=np.int64)
+        
+        wallet_list = list(wallet_ids)
+        token_list = list(token_ids)
+        wallet_count = len(wallet_list)
+        token_count = len(token_list)
+        
+        # Inverted index of per-wallet event counts for each token
+        wallet_token_codes, wallet_token_events = np.unique(
+            wallet_idx.astype(np.int64) * token_count + token_idx, return_counts=True
+        )
+        
+        # A pair needs 2+ common tokens, so wallets active on a single token never qualify;
+        # drop their events before the timing sweep
+        tokens_per_wallet = np.bincount(wallet_token_codes // token_count, minlength=wallet_count)
+        eligible = tokens_per_wallet[wallet_idx] >= 2
+        if np.count_nonzero(eligible) < 2:
             return []
         
-        # Group activities by wallet
-        wallet_activities = defaultdict(list)
-        for activity in activities:
-            wallet = activity[0]
-            wallet_activities[wallet].append(activity)
+        wallet_idx = wallet_idx[eligible]
+        token_idx = token_idx[eligible]
+        ts = ts[eligible]
+        
+        # Sort by token then time, and shift each token into its own disjoint time range
+        # so a single searchsorted sweep never matches across tokens
+        order = np.lexsort((ts, token_idx))
+        stride = int(ts.max() - ts.min()) + CORRELATION_WINDOW_NS + 1
+        key = (ts - ts.min())[order] + token_idx[order].astype(np.int64) * stride
+        widx = wallet_idx[order].astype(np.int64)
+        
+        # For each event, the later events within the window are key[i+1:hi[i]]
+        first = np.arange(1, len(key) + 1)
+        hi = np.searchsorted(key, key + CORRELATION_WINDOW_NS, side='right')
+        spans = hi - first
+        total = int(spans.sum())
+        if total == 0:
+            return []
+        
+        # Event pairs are enumerated by a flat index p in [0, total): event i owns the range
+        # [offsets[i], ends[i]). Materializing them in fixed-size blocks keeps memory flat
+        # when whale spam packs thousands of events into one window.
+        ends = np.cumsum(spans)
+        offsets = ends - spans
+        codes = np.empty(0, dtype=np.int64)
+        counts = np.empty(0, dtype=np.int64)
+        
+        for block_start in range(0, total, CORRELATION_PAIR_BLOCK):
+            p = np.arange(block_start, min(block_start + CORRELATION_PAIR_BLOCK, total))
+            left = np.searchsorted(ends, p, side='right')
+            right = first[left] + (p - offsets[left])
+            
+            # Count each co-occurring event pair once per (lower, higher) wallet pair
+            a, b = widx[left], widx[right]
+            cross = a != b
+            a, b = a[cross], b[cross]
+            if not len(a):
+                continue
+            
+            block_codes, block_counts = np.unique(np.minimum(a, b) * wallet_count + np.maximum(a, b), return_counts=True)
+            
+            # Merge into running totals; size is bounded by distinct wallet pairs, not events
+            merged, inverse = np.unique(np.concatenate((codes, block_codes)), return_inverse=True)
+            counts = np.bincount(inverse, weights=np.concatenate((counts, block_counts)), minlength=len(merged)).astype(np.int64)
+            codes = merged
+        
+        candidates = counts >= 2
+        if not candidates.any():
+            return []
+        
+        wallet_token_counts = defaultdict(dict)
+        for code, events in zip(wallet_token_codes.tolist(), wallet_token_events.tolist()):
+            wallet, token = divmod(code, token_count)
+            wallet_token_counts[wallet][token_list[token]] = events
         
         correlations = []
-        wallet_list = list(wallet_activities.keys())
         
-        # Compare each pair of wallets
-        for i in range(len(wallet_list)):
-            for j in range(i + 1, len(wallet_list)):
-                wallet_a = wallet_list[i]
-                wallet_b = wallet_list[j]
-                
-                activities_a = wallet_activities[wallet_a]
-                activities_b = wallet_activities[wallet_b]
-                
-                # Find common tokens
-                tokens_a = set(activity[1] for activity in activities_a)
-                tokens_b = set(activity[1] for activity in activities_b)
-                common_tokens = tokens_a.intersection(tokens_b)
-                
-                if len(common_tokens) >= 2:  # Trading same tokens
-                    # Check timing correlation
-                    times_a = [activity[5] for activity in activities_a if activity[1] in common_tokens]
-                    times_b = [activity[5] for activity in activities_b if activity[1] in common_tokens]
-                    
-                    # Calculate time correlation (activities within 5 minutes)
-                    time_correlations = 0
-                    for time_a in times_a:
-                        for time_b in times_b:
-                            if abs((time_a - time_b).total_seconds()) <= 300:  # 5 minutes
-                                time_correlations += 1
-                    
-                    if time_correlations >= 2:
-                        correlation_score = min(time_correlations / max(len(times_a), len(times_b)), 1.0)
-                        
-                        correlations.append({
-                            'wallet_a': wallet_a,
-                            'wallet_b': wallet_b,
-                            'common_tokens': list(common_tokens),
-                            'time_correlations': time_correlations,
-                            'correlation_score': correlation_score,
-                            'suspicion_level': 'HIGH' if correlation_score > 0.7 else 'MEDIUM'
-                        })
+        for code, time_correlations in zip(codes[candidates].tolist(), counts[candidates].tolist()):
+            idx_a, idx_b = divmod(code, wallet_count)
+            tokens_a = wallet_token_counts[idx_a]
+            tokens_b = wallet_token_counts[idx_b]
+            
+            # Find common tokens
+            common_tokens = tokens_a.keys() & tokens_b.keys()
+            if len(common_tokens) < 2:  # Trading same tokens
+                continue
+            
+            events_a = sum(tokens_a[token] for token in common_tokens)
+            events_b = sum(tokens_b[token] for token in common_tokens)
+            correlation_score = min(time_correlations / max(events_a, events_b), 1.0)
+            
+            correlations.append({
+                'wallet_a': wallet_list[idx_a],
+                'wallet_b': wallet_list[idx_b],
+                'common_tokens': list(common_tokens),
+                'time_correlations': time_correlations,
+                'correlation_score': correlation_score,
+                'suspicion_level': 'HIGH' if correlation_score > 0.7 else 'MEDIUM'
+            })
         
         return correlations
     
-    def save_alert_to_database(self, alert_data):
-        """Save pump/dump alert to database"""
-        conn = self.get_database_connection()
-        if not conn:
-            return False
+    def filter_new_alerts(self, alerts):
+        """Drop alerts already saved for the same (type, token, minute bucket)"""
+        # Buckets that have left the scan window can't be detected again, so forget them
+        cutoff = time.monotonic() - ALERT_DEDUPE_SECONDS
+        self._alerted_buckets = {
+            key: saved_at for key, saved_at in self._alerted_buckets.items() if saved_at > cutoff
+        }
         
-        try:
-            cursor = conn.cursor()
-            
-            # Create alerts table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS pump_dump_alerts (
-                    id SERIAL PRIMARY KEY,
-                    alert_type VARCHAR(50) NOT NULL,
-                    token_symbol VARCHAR(20) NOT NULL,
-                    whale_count INTEGER NOT NULL,
-                    total_volume DECIMAL(20,2) NOT NULL,
-                    confidence_score DECIMAL(3,2) NOT NULL,
-                    alert_timestamp TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                    alert_data JSONB,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-                )
-            """)
-            
-            cursor.execute("""
-                INSERT INTO pump_dump_alerts 
-                (alert_type, token_symbol, whale_count, total_volume, confidence_score, alert_data)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (
+        return [
+            alert for alert in alerts
+            if (alert['type'], alert['token'], alert['bucket']) not in self._alerted_buckets
+        ]
+    
+    def mark_alerts_saved(self, alerts):
+        """Remember saved alerts so later scans of the same window skip them"""
+        saved_at = time.monotonic()
+        for alert in alerts:
+            self._alerted_buckets[(alert['type'], alert['token'], alert['bucket'])] = saved_at
+    
+    def save_alerts_to_database(self, alerts):
+        """Save a batch of pump/dump alerts to database in a single pipelined round trip"""
+        if not alerts:
+            return 0
+        
+        # Stored payload is JSON-native (ISO 'time', json_agg activities); the 'bucket'
+        # datetime is only kept in memory for display
+        rows = [
+            (
                 alert_data['type'],
                 alert_data['token'],
                 alert_data['whale_count'],
                 alert_data['total_volume'],
                 alert_data['confidence'],
-                json.dumps(alert_data, default=str)
-            ))
-            
-            conn.commit()
-            return True
+                Json({key: value for key, value in alert_data.items() if key != 'bucket'})
+            )
+            for alert_data in alerts
+        ]
+        
+        try:
+            with self.get_database_connection() as conn, conn.cursor() as cursor:
+                with conn.pipeline():
+                    cursor.executemany(INSERT_ALERT_SQL, rows)
+                return len(rows)
             
         except Exception as e:
-            print(f"⚠️ Failed to save alert: {e}", flush=True)
-            return False
-        finally:
-            conn.close()
+            print(f"⚠️ Failed to save {len(rows)} alerts: {e}", flush=True)
+            return 0
     
-    def monitor_whale_activity(self):
+    async def monitor_whale_activity(self, event_tokens=()):
         """Main monitoring function - scan for pump/dump patterns"""
         print(f"\n⚡ ACTIVITY SCAN #{self.scan_count + 1} - PUMP/DUMP DETECTION", flush=True)
         print(f"🕐 {datetime.now(timezone.utc).strftime('%H:%M:%S UTC')} - Real-time whale monitoring", flush=True)
         print("─" * 60, flush=True)
         
-        # Get recent whale activity
-        recent_activities = self.get_recent_whale_activity(TIME_WINDOW_MINUTES)
+        # Fetch activity, aggregates and likely prices concurrently; prices are warmed for
+        # just-notified and recently active tokens so the summary lookup below hits cache
+        expected_tokens = set(event_tokens) | self._last_scan_tokens
+        recent_activity, coordination_buckets, _ = await asyncio.gather(
+            asyncio.to_thread(self.get_recent_whale_activity, TIME_WINDOW_MINUTES),
+            asyncio.to_thread(self.get_coordination_buckets, TIME_WINDOW_MINUTES),
+            asyncio.to_thread(self.get_token_prices, expected_tokens)
+        )
         
-        if not recent_activities:
+        if not recent_activity['count']:
             print("😴 No recent whale activity detected", flush=True)
             return 0
         
-        print(f"📊 Found {len(recent_activities)} whale activities in last {TIME_WINDOW_MINUTES} minutes", flush=True)
+        print(f"📊 Found {recent_activity['count']} whale activities in last {TIME_WINDOW_MINUTES} minutes", flush=True)
         
-        # Group activities by token for analysis
-        token_summary = defaultdict(lambda: {'buys': 0, 'sells': 0, 'volume': 0, 'whales': set()})
+        # Per-token summary was accumulated while streaming the activity rows
+        token_summary = recent_activity['token_summary']
         
-        for activity in recent_activities:
-            wallet, token, activity_type, tokens, usd, timestamp, tx_id = activity
-            token_summary[token]['whales'].add(wallet)
-            token_summary[token]['volume'] += float(usd)
-            
-            if activity_type in ['buy', 'transfer']:
-                token_summary[token]['buys'] += 1
-            elif activity_type == 'sell':
-                token_summary[token]['sells'] += 1
+        # One batched price lookup per scan regardless of token count; mostly cache hits from the
+        # warm-up above, but a miss does blocking HTTP/backoff, so keep it off the event loop
+        token_prices = await asyncio.to_thread(self.get_token_prices, list(token_summary))
+        self._last_scan_tokens = set(token_summary)
         
         # Display activity summary
         print(f"\n📈 WHALE ACTIVITY SUMMARY:", flush=True)
         for token, summary in token_summary.items():
             whale_count = len(summary['whales'])
-            print(f"🪙 {token}: {whale_count} whales, {summary['buys']} buys, {summary['sells']} sells, ${summary['volume']:,.0f}", flush=True)
-        
-        # Detect coordination patterns
-        coordination_alerts = self.detect_coordination_patterns(recent_activities)
-        wallet_correlations = self.analyze_wallet_correlations(recent_activities)
+            price = token_prices[token]
+            price_text = f" @ ${price:,.6g}" if price is not None else ""
+            print(f"🪙 {token}: {whale_count} whales, {summary['buys']} buys, {summary['sells']} sells, ${summary['volume']:,.0f}{price_text}", flush=True)
         
-        alerts_generated = 0
+        # Detect coordination patterns, skipping buckets already alerted on by an earlier scan
+        coordination_alerts = self.filter_new_alerts(self.detect_coordination_patterns(coordination_buckets))
+        save_task = None
         
         # Process coordination alerts
         if coordination_alerts:
@@ -341,68 +689,123 @@ class ActivityMonitor:
                 print(f"🔥 {alert['type']}: {alert['token']}", flush=True)
                 print(f"   🐋 {alert['whale_count']} whales, ${alert['total_volume']:,.0f} volume", flush=True)
                 print(f"   📊 Confidence: {alert['confidence']:.1%}", flush=True)
-                print(f"   🕐 Time: {alert['time'].strftime('%H:%M:%S UTC')}", flush=True)
-                
-                # Save alert to database
-                if self.save_alert_to_database(alert):
-                    alerts_generated += 1
-                else:
-                    print(f"⚠️ Failed to save alert: Object of type datetime is not JSON serializable", flush=True)
-        
-        # Process wallet correlations
-        if wallet_correlations:
-            print(f"\n🕵️ WALLET CORRELATIONS FOUND:", flush=True)
-            for correlation in wallet_correlations:
-                print(f"🔗 {correlation['suspicion_level']} correlation:", flush=True)
-                print(f"   👤 {correlation['wallet_a'][:10]}... ↔️ {correlation['wallet_b'][:10]}...", flush=True)
-                print(f"   🪙 Common tokens: {', '.join(correlation['common_tokens'])}", flush=True)
-                print(f"   📊 Score: {correlation['correlation_score']:.1%}", flush=True)
+                print(f"   🕐 Time: {alert['bucket'].strftime('%H:%M:%S UTC')}", flush=True)
+            
+            # Save all alerts from this scan in one batch, in the background
+            save_task = asyncio.create_task(asyncio.to_thread(self.save_alerts_to_database, coordination_alerts))
         
-        if not coordination_alerts and not wallet_correlations:
-            print("✅ No suspicious coordination patterns detected", flush=True)
+        try:
+            # Analyze wallet correlations while alerts are being written
+            wallet_correlations = self.analyze_wallet_correlations(recent_activity)
+            
+            # Process wallet correlations
+            if wallet_correlations:
+                print(f"\n🕵️ WALLET CORRELATIONS FOUND:", flush=True)
+                for correlation in wallet_correlations:
+                    print(f"🔗 {correlation['suspicion_level']} correlation:", flush=True)
+                    print(f"   👤 {correlation['wallet_a'][:10]}... ↔️ {correlation['wallet_b'][:10]}...", flush=True)
+                    print(f"   🪙 Common tokens: {', '.join(correlation['common_tokens'])}", flush=True)
+                    print(f"   📊 Score: {correlation['correlation_score']:.1%}", flush=True)
+            
+            if not coordination_alerts and not wallet_correlations:
+                print("✅ No suspicious coordination patterns detected", flush=True)
+        finally:
+            # Always settle the save, even if the analysis above raised, so saved alerts are
+            # remembered and the write isn't abandoned mid-flight
+            alerts_generated = await save_task if save_task else 0
+            if alerts_generated:
+                self.mark_alerts_saved(coordination_alerts)
+            self.total_alerts += alerts_generated
         
-        self.total_alerts += alerts_generated
         return alerts_generated
     
+    async def listen_for_whale_events(self):
+        """Open a dedicated autocommit connection subscribed to whale events"""
+        if not self.whale_events_enabled:
+            return None
+        
+        try:
+            aconn = await psycopg.AsyncConnection.connect(DATABASE_URL, autocommit=True)
+            await aconn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(WHALE_EVENT_CHANNEL)))
+            print(f"👂 Listening for {WHALE_EVENT_CHANNEL} notifications", flush=True)
+            return aconn
+        except Exception as e:
+            print(f"⚠️ Failed to listen for whale events, polling instead: {e}", flush=True)
+            return None
+    
+    async def wait_for_whale_events(self, aconn, last_scan_at):
+        """Wait for whale events (or the fallback interval) and return the tokens involved"""
+        tokens = set()
+        
+        async for notify in aconn.notifies(timeout=SCAN_INTERVAL, stop_after=1):
+            tokens.add(notify.payload)
+        
+        # Debounce: fold the rest of a burst into the same scan, and keep scans at least
+        # MIN_SCAN_SPACING_SECONDS apart under sustained activity
+        if tokens:
+            settle = max(EVENT_DEBOUNCE_SECONDS, MIN_SCAN_SPACING_SECONDS - (time.monotonic() - last_scan_at))
+            async for notify in aconn.notifies(timeout=settle):
+                tokens.add(notify.payload)
+        
+        return tokens
+    
     async def run_monitoring_loop(self):
-        """Main monitoring loop - continuous 60-second scanning"""
+        """Main monitoring loop - event-driven scanning with a 60-second fallback"""
         print("⚡ FCB ACTIVITY MONITOR - REAL-TIME PUMP/DUMP DETECTION", flush=True)
         print("=" * 80, flush=True)
-        print(f"🔍 Scanning database whales every {SCAN_INTERVAL} seconds", flush=True)
+        print(f"🔍 Scanning on whale events, at least every {SCAN_INTERVAL} seconds", flush=True)
         print(f"🎯 Coordination threshold: {COORDINATION_THRESHOLD}+ whales", flush=True)
         print(f"⏰ Time window: {TIME_WINDOW_MINUTES} minutes", flush=True)
-        print(f"🚨 Pump detection: {PUMP_INDICATORS['rapid_buys']}+ rapid buys", flush=True)
-        print(f"📉 Dump detection: {DUMP_INDICATORS['rapid_sells']}+ rapid sells", flush=True)
+        print(f"🚨 Pump detection: {PUMP_RAPID_BUYS}+ rapid buys", flush=True)
+        print(f"📉 Dump detection: {DUMP_RAPID_SELLS}+ rapid sells", flush=True)
         print(f"💰 Minimum whale threshold: ${WHALE_THRESHOLD:,}", flush=True)
         
         # Get initial whale count
-        database_whales = self.get_database_whales()
-        print(f"🐋 Monitoring {len(database_whales)} database whales for coordination", flush=True)
+        whale_count = self.get_database_whale_count()
+        print(f"🐋 Monitoring {whale_count} database whales for coordination", flush=True)
         
-        while True:
-            try:
-                self.scan_count += 1
-                
-                # Monitor whale activity
-                alerts = self.monitor_whale_activity()
-                
-                # Summary
-                print(f"\n📊 SCAN #{self.scan_count} COMPLETE:", flush=True)
-                print(f"🚨 Alerts this scan: {alerts}", flush=True)
-                print(f"📈 Total alerts generated: {self.total_alerts}", flush=True)
-                print(f"⏰ Next scan in {SCAN_INTERVAL} seconds...", flush=True)
-                print("=" * 60, flush=True)
-                
-                # Wait for next scan
-                await asyncio.sleep(SCAN_INTERVAL)
-                
-            except KeyboardInterrupt:
-                print("\n🛑 Activity monitor stopped by user", flush=True)
-                break
-            except Exception as e:
-                print(f"⚠️ Monitoring error: {e}", flush=True)
-                print(f"🔄 Retrying in {SCAN_INTERVAL} seconds...", flush=True)
-                await asyncio.sleep(SCAN_INTERVAL)
+        listener = await self.listen_for_whale_events()
+        event_tokens = set()
+        
+        try:
+            while True:
+                try:
+                    self.scan_count += 1
+                    scan_started_at = time.monotonic()
+                    
+                    # Monitor whale activity
+                    alerts = await self.monitor_whale_activity(event_tokens)
+                    event_tokens = set()
+                    
+                    # Summary
+                    print(f"\n📊 SCAN #{self.scan_count} COMPLETE:", flush=True)
+                    print(f"🚨 Alerts this scan: {alerts}", flush=True)
+                    print(f"📈 Total alerts generated: {self.total_alerts}", flush=True)
+                    print(f"⏰ Next scan on whale activity or in {SCAN_INTERVAL} seconds...", flush=True)
+                    print("=" * 60, flush=True)
+                    
+                    # Re-subscribe if the listener connection dropped
+                    if listener is None or listener.closed:
+                        listener = await self.listen_for_whale_events()
+                    
+                    # Wait for next scan
+                    if listener:
+                        event_tokens = await self.wait_for_whale_events(listener, scan_started_at)
+                        if event_tokens:
+                            print(f"🔔 Whale activity on {', '.join(sorted(event_tokens))}", flush=True)
+                    else:
+                        await asyncio.sleep(SCAN_INTERVAL)
+                    
+                except KeyboardInterrupt:
+                    print("\n🛑 Activity monitor stopped by user", flush=True)
+                    break
+                except Exception as e:
+                    print(f"⚠️ Monitoring error: {e}", flush=True)
+                    print(f"🔄 Retrying in {SCAN_INTERVAL} seconds...", flush=True)
+                    await asyncio.sleep(SCAN_INTERVAL)
+        finally:
+            if listener:
+                await listener.close()
 
 def main():
     """Main execution"""
@@ -413,6 +816,8 @@ def main():
         asyncio.run(monitor.run_monitoring_loop())
     except KeyboardInterrupt:
         print("\n👋 FCB Activity Monitor stopped", flush=True)
+    finally:
+        monitor.pool.close()
 
 if __name__ == "__main__":
     main()
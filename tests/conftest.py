@@ -0,0 +1,23 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+import activity_monitor as am
+
+
+@pytest.fixture
+def monitor():
+    """ActivityMonitor with its in-memory state but no pool, schema or listener"""
+    monitor = am.ActivityMonitor.__new__(am.ActivityMonitor)
+    monitor.scan_count = 0
+    monitor.total_alerts = 0
+    monitor._price_cache = {}
+    monitor._price_request_tokens = float(am.COINGECKO_RATE_LIMIT_PER_MINUTE)
+    monitor._price_request_refill_at = time.monotonic()
+    monitor._last_scan_tokens = set()
+    monitor._alerted_buckets = {}
+    return monitor
@@ -0,0 +1,128 @@
+"""
+Alert dedupe across rescans of the same window, and event debounce spacing
+"""
+
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+import activity_monitor as am
+
+# Naive, like a timestamp-without-time-zone block_timestamp column would come back
+BUCKET = datetime(2026, 1, 1, 12, 0)
+
+
+def pump_rows(token='PEPE', bucket=BUCKET):
+    """Bucket aggregate rows that trip a single POTENTIAL_PUMP alert"""
+    buys = am.PUMP_RAPID_BUYS
+    return [(token, bucket, 'buy', buys, 50_000.0, buys, [], buys)]
+
+
+def stub_scan(monitor, rows, saved=None):
+    """Replace DB and HTTP access with canned data; returns the list of save calls"""
+    batch = monitor.new_activity_batch()
+    batch['count'] = 1
+    batch['token_summary']['PEPE']['buys'] = 1
+    save_calls = []
+
+    def save(alerts):
+        save_calls.append(alerts)
+        return len(alerts) if saved is None else saved
+
+    monitor.get_recent_whale_activity = lambda minutes: batch
+    monitor.get_coordination_buckets = lambda minutes: rows
+    monitor.fetch_coingecko_prices = lambda symbols: {}
+    monitor.save_alerts_to_database = save
+    return save_calls
+
+
+def test_rescan_of_same_window_yields_no_new_alerts(monitor):
+    save_calls = stub_scan(monitor, pump_rows())
+
+    assert asyncio.run(monitor.monitor_whale_activity()) == 1
+    assert asyncio.run(monitor.monitor_whale_activity()) == 0
+    assert len(save_calls) == 1
+    assert monitor.total_alerts == 1
+
+
+def test_new_bucket_still_alerts(monitor):
+    stub_scan(monitor, pump_rows())
+    asyncio.run(monitor.monitor_whale_activity())
+
+    stub_scan(monitor, pump_rows() + pump_rows(token='WIF'))
+    assert asyncio.run(monitor.monitor_whale_activity()) == 1
+    assert monitor.total_alerts == 2
+
+
+def test_keys_expire_once_bucket_leaves_window(monitor, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(am.time, 'monotonic', lambda: now)
+    alerts = monitor.detect_coordination_patterns(pump_rows())
+    monitor.mark_alerts_saved(alerts)
+
+    now += am.ALERT_DEDUPE_SECONDS - 1
+    assert monitor.filter_new_alerts(alerts) == []
+
+    now += 2
+    assert monitor.filter_new_alerts(alerts) == alerts
+    assert monitor._alerted_buckets == {}
+
+
+def test_failed_save_does_not_mark_alerts(monitor):
+    save_calls = stub_scan(monitor, pump_rows(), saved=0)
+
+    assert asyncio.run(monitor.monitor_whale_activity()) == 0
+    assert asyncio.run(monitor.monitor_whale_activity()) == 0
+    assert len(save_calls) == 2
+    assert monitor._alerted_buckets == {}
+
+
+def test_save_settles_when_analysis_raises(monitor):
+    stub_scan(monitor, pump_rows())
+
+    def explode(activity):
+        raise RuntimeError('boom')
+
+    monitor.analyze_wallet_correlations = explode
+    with pytest.raises(RuntimeError):
+        asyncio.run(monitor.monitor_whale_activity())
+
+    assert monitor.total_alerts == 1
+    assert list(monitor._alerted_buckets) == [('POTENTIAL_PUMP', 'PEPE', BUCKET)]
+
+
+class FakeListener:
+    """Stands in for the LISTEN connection: one list of payloads per notifies() call"""
+
+    def __init__(self, *bursts):
+        self.bursts = list(bursts)
+        self.timeouts = []
+
+    async def notifies(self, timeout=None, stop_after=None):
+        self.timeouts.append(timeout)
+        for payload in (self.bursts.pop(0) if self.bursts else [])[:stop_after]:
+            yield am.psycopg.Notify(am.WHALE_EVENT_CHANNEL, payload, 0)
+
+
+def test_no_events_waits_for_fallback_interval(monitor):
+    listener = FakeListener([])
+    assert asyncio.run(monitor.wait_for_whale_events(listener, time.monotonic())) == set()
+    assert listener.timeouts == [am.SCAN_INTERVAL]
+
+
+def test_events_right_after_a_scan_wait_out_min_spacing(monitor):
+    listener = FakeListener(['PEPE'], ['WIF', 'PEPE'])
+    tokens = asyncio.run(monitor.wait_for_whale_events(listener, time.monotonic()))
+
+    assert tokens == {'PEPE', 'WIF'}
+    assert listener.timeouts[0] == am.SCAN_INTERVAL
+    assert listener.timeouts[1] == pytest.approx(am.MIN_SCAN_SPACING_SECONDS, abs=1)
+
+
+def test_events_long_after_a_scan_only_debounce(monitor):
+    listener = FakeListener(['PEPE'], [])
+    last_scan_at = time.monotonic() - 10 * am.MIN_SCAN_SPACING_SECONDS
+    assert asyncio.run(monitor.wait_for_whale_events(listener, last_scan_at)) == {'PEPE'}
+    assert listener.timeouts == [am.SCAN_INTERVAL, am.EVENT_DEBOUNCE_SECONDS]
@@ -0,0 +1,94 @@
+"""
+CoinGecko price lookups: TTL cache, batching, 429 backoff and fallbacks
+"""
+
+import time
+
+import pytest
+import requests
+
+import activity_monitor as am
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, data=None):
+        self.status_code = status_code
+        self.data = data or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+    def json(self):
+        return self.data
+
+
+@pytest.fixture
+def coingecko(monkeypatch):
+    """Queue of canned responses (or exceptions) for requests.get; records each call's params"""
+    calls = []
+    responses = []
+    sleeps = []
+
+    def get(url, params=None, headers=None, timeout=None):
+        calls.append(params)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(am.requests, 'get', get)
+    monkeypatch.setattr(am.time, 'sleep', sleeps.append)
+    return calls, responses, sleeps
+
+
+def test_cache_hit_inside_ttl(monitor, coingecko):
+    calls, _, _ = coingecko
+    monitor._price_cache['UNI'] = (11.0, time.monotonic() + am.SCAN_INTERVAL)
+
+    assert monitor.get_token_prices(['UNI']) == {'UNI': 11.0}
+    assert calls == []
+
+
+def test_misses_are_batched_into_one_request(monitor, coingecko):
+    calls, responses, _ = coingecko
+    responses.append(FakeResponse(data={'uniswap': {'usd': 7.5}, 'chainlink': {'usd': 14}, 'aave': {'usd': 210}}))
+
+    prices = monitor.get_token_prices(['UNI', 'LINK', 'AAVE'])
+
+    assert prices == {'UNI': 7.5, 'LINK': 14.0, 'AAVE': 210.0}
+    assert len(calls) == 1
+    assert sorted(calls[0]['ids'].split(',')) == ['aave', 'chainlink', 'uniswap']
+
+    # Now cached
+    assert monitor.get_token_prices(['UNI', 'LINK', 'AAVE']) == prices
+    assert len(calls) == 1
+
+
+def test_retries_after_rate_limit(monitor, coingecko):
+    calls, responses, sleeps = coingecko
+    responses.extend([FakeResponse(429), FakeResponse(429), FakeResponse(data={'pepe': {'usd': 0.00001}})])
+
+    assert monitor.get_token_prices(['PEPE']) == {'PEPE': 0.00001}
+    assert len(calls) == 3
+    assert sleeps == [1, 2]
+
+
+def test_stale_price_fallback_is_negative_cached(monitor, coingecko):
+    calls, responses, _ = coingecko
+    monitor._price_cache['LINK'] = (19.0, time.monotonic() - 1)
+    responses.append(requests.ConnectionError('down'))
+
+    assert monitor.get_token_prices(['LINK', 'CRV']) == {'LINK': 19.0, 'CRV': am.FALLBACK_TOKEN_PRICES['CRV']}
+    assert len(calls) == 1
+
+    # The outage isn't retried again until the TTL runs out
+    assert monitor.get_token_prices(['LINK', 'CRV']) == {'LINK': 19.0, 'CRV': am.FALLBACK_TOKEN_PRICES['CRV']}
+    assert len(calls) == 1
+
+
+def test_unknown_token_is_unpriced_without_a_request(monitor, coingecko):
+    calls, _, _ = coingecko
+
+    assert monitor.get_token_prices(['NOTATOKEN']) == {'NOTATOKEN': None}
+    assert calls == []
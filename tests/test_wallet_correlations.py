@@ -0,0 +1,136 @@
+"""
+Wallet correlation kernel vs. a brute-force same-token reference
+"""
+
+import random
+import tracemalloc
+
+import pytest
+
+import activity_monitor as am
+
+NS = 1_000_000_000
+BASE_NS = 1_767_225_600 * NS
+
+
+def make_batch(monitor, activities):
+    """Pack (wallet, token, ts_ns) tuples the same way get_recent_whale_activity streams them"""
+    batch = monitor.new_activity_batch()
+    for wallet, token, ts_ns in activities:
+        batch['wallets'].append(batch['wallet_ids'].setdefault(wallet, len(batch['wallet_ids'])))
+        batch['tokens'].append(batch['token_ids'].setdefault(token, len(batch['token_ids'])))
+        batch['times'].append(ts_ns)
+    batch['count'] = len(activities)
+    return batch
+
+
+def brute_force(activities):
+    """O(W^2 T^2) reference: same-token events within the window, 2+ common tokens, 2+ hits"""
+    by_wallet = {}
+    for activity in activities:
+        by_wallet.setdefault(activity[0], []).append(activity)
+
+    wallets = list(by_wallet)
+    results = []
+    for i in range(len(wallets)):
+        for j in range(i + 1, len(wallets)):
+            events_a, events_b = by_wallet[wallets[i]], by_wallet[wallets[j]]
+            common = {e[1] for e in events_a} & {e[1] for e in events_b}
+            if len(common) < 2:
+                continue
+
+            hits = sum(
+                1 for a in events_a for b in events_b
+                if a[1] == b[1] and abs(a[2] - b[2]) <= am.CORRELATION_WINDOW_NS
+            )
+            if hits < 2:
+                continue
+
+            count_a = sum(1 for e in events_a if e[1] in common)
+            count_b = sum(1 for e in events_b if e[1] in common)
+            results.append((wallets[i], wallets[j], sorted(common), hits, min(hits / max(count_a, count_b), 1.0)))
+    return results
+
+
+def run_kernel(monitor, activities):
+    return [
+        (c['wallet_a'], c['wallet_b'], sorted(c['common_tokens']), c['time_correlations'], c['correlation_score'])
+        for c in monitor.analyze_wallet_correlations(make_batch(monitor, activities))
+    ]
+
+
+def test_empty_batch(monitor):
+    assert monitor.analyze_wallet_correlations(monitor.new_activity_batch()) == []
+
+
+def test_single_wallet(monitor):
+    activities = [('w0', token, BASE_NS + i * NS) for i, token in enumerate('ABAB')]
+    assert run_kernel(monitor, activities) == []
+
+
+def test_wallets_on_one_token_only(monitor):
+    # Plenty of in-window co-occurrences, but no pair shares two tokens
+    activities = [(f"w{i % 3}", 'A', BASE_NS + i * NS) for i in range(12)]
+    activities += [('w3', 'B', BASE_NS), ('w3', 'C', BASE_NS)]
+    assert run_kernel(monitor, activities) == []
+
+
+@pytest.mark.parametrize('gap_seconds, expected_hits', [(300, 2), (301, 0)])
+def test_window_boundary(monitor, gap_seconds, expected_hits):
+    gap = gap_seconds * NS
+    activities = [
+        ('w0', 'A', BASE_NS), ('w1', 'A', BASE_NS + gap),
+        ('w0', 'B', BASE_NS), ('w1', 'B', BASE_NS + gap),
+    ]
+    result = run_kernel(monitor, activities)
+    assert result == brute_force(activities)
+    assert [r[3] for r in result] == ([expected_hits] if expected_hits else [])
+
+
+def test_cross_token_events_do_not_correlate(monitor):
+    # Same instant, but on different tokens
+    activities = [('w0', 'A', BASE_NS), ('w1', 'B', BASE_NS), ('w0', 'B', BASE_NS + 3600 * NS), ('w1', 'A', BASE_NS + 3600 * NS)]
+    assert run_kernel(monitor, activities) == []
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_matches_brute_force(monitor, seed):
+    rng = random.Random(seed)
+    activities = [
+        (f"w{rng.randint(0, 15)}", rng.choice('ABCD'), BASE_NS + rng.randint(0, 1800) * NS)
+        for _ in range(rng.randint(0, 120))
+    ]
+    assert run_kernel(monitor, activities) == brute_force(activities)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_blocked_sweep_matches_brute_force(monitor, monkeypatch, seed):
+    # Tiny blocks force pair ranges to straddle block boundaries
+    monkeypatch.setattr(am, 'CORRELATION_PAIR_BLOCK', 7)
+    rng = random.Random(seed)
+    activities = [
+        (f"w{rng.randint(0, 5)}", rng.choice('AB'), BASE_NS + rng.randint(0, 600) * NS)
+        for _ in range(rng.randint(20, 80))
+    ]
+    assert run_kernel(monitor, activities) == brute_force(activities)
+
+
+def test_dense_batch_memory_is_bounded(monitor):
+    # 8k events on 2 tokens packed into 15 minutes: ~4.3M in-window event pairs, which
+    # would need hundreds of MB if materialized at once
+    rng = random.Random(0)
+    activities = [
+        (f"w{i % 41}", 'AB'[i % 2], BASE_NS + rng.randint(0, 900) * NS)
+        for i in range(8000)
+    ]
+    batch = make_batch(monitor, activities)
+
+    tracemalloc.start()
+    try:
+        correlations = monitor.analyze_wallet_correlations(batch)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert correlations
+    assert peak < 32 * 1024 * 1024